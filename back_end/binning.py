@@ -0,0 +1,26 @@
+# binning.py - quantile binning shared by train_model.py and stream_app.py
+# (both must bin identically, so the rule lives only here)
+import numpy as np
+
+N_BINS = 256
+
+
+def fit_bins(X, n_bins=N_BINS):
+    """
+    Per-feature inner quantile edges of a (n, n_features) array: up to
+    n_bins - 1 sorted edges each, so codes fit in uint8. Edges are float32,
+    the same dtype as the rows they are compared against.
+    """
+    qs = np.linspace(0, 1, n_bins + 1)
+    return [
+        np.unique(np.quantile(X[:, j], qs)[1:-1].astype(np.float32))
+        for j in range(X.shape[1])
+    ]
+
+
+def quantize(rows, bins):
+    """Map a (k, n_features) float32 batch to uint8 bin codes."""
+    out = np.empty(rows.shape, dtype=np.uint8)
+    for j, edges in enumerate(bins):
+        out[:, j] = np.searchsorted(edges, rows[:, j], side="right")
+    return out
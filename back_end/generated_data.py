@@ -1,9 +1,8 @@
 # generate_dataset_realistic.py
 import os
-import random
 import ipaddress
 import time
-import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 
 os.makedirs("dataset", exist_ok=True)
@@ -35,103 +34,141 @@ dest_ports_common = [80, 443, 1883, 5683, 502]  # include modbus 502 for industr
 
 attack_patterns = ["normal", "DoS", "DataExfil", "Spoofing", "Scan"]
 
-rows = []
-
-def rand_ip():
-    # generate random private IPv4
-    return str(ipaddress.IPv4Address(random.randint(int(ipaddress.IPv4Address("10.0.0.0")),
-                                                    int(ipaddress.IPv4Address("10.255.255.255")))))
-
-for device_id in range(1, NUM_DEVICES + 1):
-    dtype = random.choice(device_types)
-    proto_choices = protocols_by_device.get(dtype, ["mqtt","udp"])
-    base_time = START_TIME + timedelta(seconds=random.randint(0, 300))
-    # base behavior parameters vary by device type
-    if dtype in ["SmartCam", "IndustrialSensor"]:
-        base_packet_rate = random.randint(120, 400)
-        base_byte_rate = random.randint(2000, 8000)
-    elif dtype in ["Thermostat", "SmartPlug", "SmartLight"]:
-        base_packet_rate = random.randint(20, 120)
-        base_byte_rate = random.randint(200, 2000)
-    else:
-        base_packet_rate = random.randint(30, 180)
-        base_byte_rate = random.randint(500, 3000)
-
-    # device IPs and ports
-    src_ip = rand_ip()
-    dst_ip = "192.168.1.1"
-    src_port_base = random.randint(20000, 40000)
-
-    # simulate sequence of records for device
-    current_time = base_time
-    for rec in range(RECORDS_PER_DEVICE):
-        # often normal, sometimes attack
-        attack_roll = random.random()
-        if attack_roll < 0.90:
-            attack = "normal"
-        else:
-            attack = random.choices(attack_patterns[1:], weights=[0.5,0.3,0.1,0.1])[0]
-
-        # tweak values based on attack
-        if attack == "normal":
-            packet_rate = int(random.gauss(base_packet_rate, base_packet_rate*0.15))
-            byte_rate = int(random.gauss(base_byte_rate, base_byte_rate*0.20))
-            duration = round(random.uniform(0.2, 6.0), 2)
-        elif attack == "DoS":
-            # bursts
-            packet_rate = random.randint(int(base_packet_rate*3), int(base_packet_rate*8))
-            byte_rate = random.randint(int(base_byte_rate*3), int(base_byte_rate*10))
-            duration = round(random.uniform(1.0, 60.0), 2)
-        elif attack == "DataExfil":
-            packet_rate = random.randint(int(base_packet_rate*1.2), int(base_packet_rate*3))
-            byte_rate = random.randint(int(base_byte_rate*4), int(base_byte_rate*20))
-            duration = round(random.uniform(20.0, 300.0), 2)
-        elif attack == "Spoofing":
-            # inconsistent protocol/port combos
-            packet_rate = int(random.gauss(base_packet_rate*1.1, base_packet_rate*0.3))
-            byte_rate = int(random.gauss(base_byte_rate*1.2, base_byte_rate*0.3))
-            duration = round(random.uniform(0.1, 15.0), 2)
-        else:  # Scan
-            packet_rate = random.randint(5, 200)
-            byte_rate = random.randint(200, 2000)
-            duration = round(random.uniform(0.05, 2.0), 2)
-
-        # choose protocol (attack can force odd protocol)
-        if attack == "Spoofing":
-            protocol = random.choice(["http", "udp", "mqtt"])  # random mismatch
-        else:
-            protocol = random.choice(proto_choices)
-
-        src_port = src_port_base + (rec % 500)
-        dst_port = random.choice(dest_ports_common)
-
-        # derived features
-        packet_size = round(byte_rate / max(1, packet_rate), 2)  # avg bytes per packet
-        is_attack_label = "Attack" if attack != "normal" else "Normal"
-
-        rows.append({
-            "timestamp": (current_time + timedelta(seconds=rec * TIME_STEP_SECONDS)).strftime("%Y-%m-%d %H:%M:%S"),
-            "device_id": f"dev_{device_id:03d}",
-            "device_type": dtype,
-            "src_ip": src_ip,
-            "dst_ip": dst_ip,
-            "protocol": protocol,
-            "source_port": int(src_port),
-            "destination_port": int(dst_port),
-            "packet_rate": int(max(0, packet_rate)),
-            "byte_rate": int(max(0, byte_rate)),
-            "packet_size": float(max(1.0, packet_size)),
-            "connection_duration": duration,
-            "attack_type": attack,
-            "label": is_attack_label
-        })
+rng = np.random.default_rng()
+N, R = NUM_DEVICES, RECORDS_PER_DEVICE
+
+def rand_ips(n):
+    # generate n random private IPv4 addresses
+    lo = int(ipaddress.IPv4Address("10.0.0.0"))
+    hi = int(ipaddress.IPv4Address("10.255.255.255"))
+    return [str(ipaddress.IPv4Address(int(x))) for x in rng.integers(lo, hi + 1, size=n)]
+
+def randint(lo, hi):
+    # inclusive integer draw with per-element bounds (like random.randint)
+    return rng.integers(np.floor(lo).astype(np.int64), np.floor(hi).astype(np.int64) + 1)
+
+def uniform2(lo, hi):
+    # uniform durations rounded to 2 decimals, one per record
+    return np.round(rng.uniform(lo, hi, size=(N, R)), 2)
+
+# ---------- per-device parameters (length N) ----------
+dtypes = np.array(device_types)[rng.integers(0, len(device_types), size=N)]
+base_offsets = rng.integers(0, 301, size=N)
+
+# base behavior parameters vary by device type
+high_bw = np.isin(dtypes, ["SmartCam", "IndustrialSensor"])
+low_bw = np.isin(dtypes, ["Thermostat", "SmartPlug", "SmartLight"])
+base_packet_rate = np.select(
+    [high_bw, low_bw],
+    [rng.integers(120, 401, size=N), rng.integers(20, 121, size=N)],
+    rng.integers(30, 181, size=N),
+)
+base_byte_rate = np.select(
+    [high_bw, low_bw],
+    [rng.integers(2000, 8001, size=N), rng.integers(200, 2001, size=N)],
+    rng.integers(500, 3001, size=N),
+)
+
+# device IPs and ports
+src_ips = rand_ips(N)
+dst_ip = "192.168.1.1"
+src_port_base = rng.integers(20000, 40001, size=N)
+
+# protocol choices per device, padded to a rectangle for vectorized lookup
+proto_lists = [protocols_by_device.get(d, ["mqtt", "udp"]) for d in dtypes]
+proto_width = max(len(p) for p in proto_lists)
+proto_table = np.array([p + [p[0]] * (proto_width - len(p)) for p in proto_lists])
+proto_counts = np.array([len(p) for p in proto_lists])
+
+# ---------- per-record draws (shape N x R) ----------
+bpr = base_packet_rate[:, None].astype(np.float64)
+bbr = base_byte_rate[:, None].astype(np.float64)
+
+# often normal, sometimes attack (index into attack_patterns)
+attack_idx = np.where(
+    rng.random((N, R)) < 0.90,
+    0,
+    rng.choice([1, 2, 3, 4], size=(N, R), p=[0.5, 0.3, 0.1, 0.1]),
+)
+is_normal, is_dos, is_exfil, is_spoof = (attack_idx == k for k in range(4))
+conds = [is_normal, is_dos, is_exfil, is_spoof]  # default branch = Scan
+
+# tweak values based on attack
+packet_rate = np.select(conds, [
+    np.trunc(rng.normal(bpr, bpr * 0.15, size=(N, R))),
+    randint(bpr * 3, bpr * 8),                      # DoS bursts
+    randint(bpr * 1.2, bpr * 3),
+    np.trunc(rng.normal(bpr * 1.1, bpr * 0.3, size=(N, R))),
+], rng.integers(5, 201, size=(N, R)))
+byte_rate = np.select(conds, [
+    np.trunc(rng.normal(bbr, bbr * 0.20, size=(N, R))),
+    randint(bbr * 3, bbr * 10),
+    randint(bbr * 4, bbr * 20),
+    np.trunc(rng.normal(bbr * 1.2, bbr * 0.3, size=(N, R))),
+], rng.integers(200, 2001, size=(N, R)))
+duration = np.select(conds, [
+    uniform2(0.2, 6.0),
+    uniform2(1.0, 60.0),
+    uniform2(20.0, 300.0),
+    uniform2(0.1, 15.0),
+], uniform2(0.05, 2.0))
+
+# choose protocol (spoofing forces a random mismatch)
+proto_pick = (rng.random((N, R)) * proto_counts[:, None]).astype(np.int64)
+protocol = np.where(
+    is_spoof,
+    rng.choice(["http", "udp", "mqtt"], size=(N, R)),
+    np.take_along_axis(proto_table, proto_pick, axis=1),
+)
+
+rec = np.arange(R)
+src_port = src_port_base[:, None] + (rec % 500)
+dst_port = rng.choice(dest_ports_common, size=(N, R))
+
+# derived features
+packet_size = np.round(byte_rate / np.maximum(1, packet_rate), 2)  # avg bytes per packet
+
+seconds = base_offsets[:, None] + rec * TIME_STEP_SECONDS
+timestamps = np.char.replace(
+    np.datetime_as_string(np.datetime64(START_TIME, "s") + seconds, unit="s"),
+    "T", " ",
+)
+
+columns = {
+    "timestamp": timestamps,
+    "device_id": np.repeat([f"dev_{i:03d}" for i in range(1, N + 1)], R).reshape(N, R),
+    "device_type": np.broadcast_to(dtypes[:, None], (N, R)),
+    "src_ip": np.broadcast_to(np.array(src_ips)[:, None], (N, R)),
+    "dst_ip": np.full((N, R), dst_ip),
+    "protocol": protocol,
+    "source_port": src_port,
+    "destination_port": dst_port,
+    "packet_rate": np.maximum(0, packet_rate).astype(np.int64),
+    "byte_rate": np.maximum(0, byte_rate).astype(np.int64),
+    "packet_size": np.maximum(1.0, packet_size),
+    "connection_duration": duration,
+    "attack_type": np.array(attack_patterns)[attack_idx],
+    "label": np.where(is_normal, "Normal", "Attack"),
+}
 
 # shuffle for variety
-random.shuffle(rows)
+order = rng.permutation(N * R)
+cols = [arr.ravel()[order].tolist() for arr in columns.values()]
 
-df = pd.DataFrame(rows)
+# all fields are numeric or plain ASCII → no quoting; buffered chunked writes
 out_path = "dataset/iot_data_realistic.csv"
-df.to_csv(out_path, index=False)
+fmt = ",".join(["%s"] * len(columns)) + "\n"
+header = ",".join(columns) + "\n"
+with open(out_path, "w", newline="") as f:
+    f.write(header)
+    buf = []
+    for row in zip(*cols):
+        buf.append(fmt % row)
+        if len(buf) >= 1024:
+            f.write("".join(buf))
+            buf.clear()
+    f.write("".join(buf))
+
 print("✅ Saved realistic dataset to", out_path)
-print("Shape:", df.shape)
-print(df.head(10).to_string(index=False))
+print("Shape:", (N * R, len(columns)))
+print(header + "".join(fmt % row for row in zip(*(c[:10] for c in cols))), end="")
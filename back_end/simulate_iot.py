@@ -1,12 +1,15 @@
-import requests
+import asyncio
+import aiohttp
 import random
-import time
-import threading
+import numpy as np
 
 # Backend endpoint
 SERVER_URL = "http://localhost:5000/api/packet"
 
-
+# Shared HTTP client: keep-alive pool size and per-request timeout
+POOL_LIMIT = 32
+KEEPALIVE_TIMEOUT = 60
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5)
 
 # Each device sends a packet every 6–12 seconds (slow + realistic)
 INTERVAL_RANGE = (6.0, 12.0)
@@ -39,7 +42,40 @@ DEVICES = [
 ATTACK_PROB = 0.10
 
 
-def generate_packet(device_id: str, device_type: str, protocol: str) -> dict:
+# how many uniforms each device pre-draws per NumPy call
+RANDOM_POOL_SIZE = 64
+
+
+class RandomPool:
+    """
+    Per-device source of random numbers: draws RANDOM_POOL_SIZE uniforms in
+    one numpy Generator call and hands them out one by one, instead of a
+    module-level `random` call (and lock) per value.
+    """
+
+    def __init__(self, size: int = RANDOM_POOL_SIZE):
+        self.rng = np.random.default_rng()
+        self.size = size
+        self.buf = []
+
+    def random(self) -> float:
+        if not self.buf:
+            self.buf = self.rng.random(self.size).tolist()
+        return self.buf.pop()
+
+    def randint(self, lo: int, hi: int) -> int:
+        # inclusive, like random.randint
+        return lo + int(self.random() * (hi - lo + 1))
+
+    def uniform(self, lo: float, hi: float) -> float:
+        return lo + (hi - lo) * self.random()
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+
+def generate_packet(device_id: str, device_type: str, protocol: str,
+                    rnd: RandomPool) -> dict:
     """
     Generate one synthetic IoT traffic packet with optional attack behaviour.
     """
@@ -49,40 +85,40 @@ def generate_packet(device_id: str, device_type: str, protocol: str) -> dict:
     low_bandwidth = ["Thermostat", "SmartPlug", "SmartLight"]
 
     if device_type in high_bandwidth:
-        base_rate = random.randint(120, 350)
-        base_bytes = random.randint(2000, 9000)
+        base_rate = rnd.randint(120, 350)
+        base_bytes = rnd.randint(2000, 9000)
     elif device_type in low_bandwidth:
-        base_rate = random.randint(20, 100)
-        base_bytes = random.randint(300, 1500)
+        base_rate = rnd.randint(20, 100)
+        base_bytes = rnd.randint(300, 1500)
     else:
-        base_rate = random.randint(30, 180)
-        base_bytes = random.randint(400, 2000)
+        base_rate = rnd.randint(30, 180)
+        base_bytes = rnd.randint(400, 2000)
 
-    duration = round(random.uniform(0.2, 5.5), 2)
+    duration = round(rnd.uniform(0.2, 5.5), 2)
     attack_type = "Normal"
 
     # Attack simulation
-    if random.random() < ATTACK_PROB:
-        attack_type = random.choice(["DoS", "Exfiltration", "Spoofing", "Scanning"])
+    if rnd.random() < ATTACK_PROB:
+        attack_type = rnd.choice(["DoS", "Exfiltration", "Spoofing", "Scanning"])
 
         if attack_type == "DoS":
-            base_rate *= random.randint(3, 6)
-            base_bytes *= random.randint(3, 6)
+            base_rate *= rnd.randint(3, 6)
+            base_bytes *= rnd.randint(3, 6)
 
         elif attack_type == "Exfiltration":
-            base_rate *= random.randint(2, 4)
-            base_bytes *= random.randint(4, 10)
-            duration = round(random.uniform(10, 40), 2)
+            base_rate *= rnd.randint(2, 4)
+            base_bytes *= rnd.randint(4, 10)
+            duration = round(rnd.uniform(10, 40), 2)
 
         elif attack_type == "Spoofing":
-            protocol = random.choice(["mqtt", "udp", "http"])
+            protocol = rnd.choice(["mqtt", "udp", "http"])
             base_rate *= 2
             base_bytes *= 2
 
         elif attack_type == "Scanning":
-            base_rate = random.randint(60, 200)
-            base_bytes = random.randint(300, 1200)
-            duration = round(random.uniform(0.05, 1.5), 2)
+            base_rate = rnd.randint(60, 200)
+            base_bytes = rnd.randint(300, 1200)
+            duration = round(rnd.uniform(0.05, 1.5), 2)
 
     packet_size = round(base_bytes / max(1, base_rate), 2)
 
@@ -94,62 +130,70 @@ def generate_packet(device_id: str, device_type: str, protocol: str) -> dict:
         "byte_rate": base_bytes,
         "packet_size": packet_size,
         "connection_duration": duration,
-        "source_port": random.randint(1000, 65535),
-        "destination_port": random.choice([80, 443, 1883, 5683, 502]),
+        "source_port": rnd.randint(1000, 65535),
+        "destination_port": rnd.choice([80, 443, 1883, 5683, 502]),
         "attack_type": attack_type,  # used by threat intel backend
     }
 
 
-def simulate_device(device_id: str, device_type: str, protocols: list[str], start_delay: float):
+async def simulate_device(session: aiohttp.ClientSession, device_id: str,
+                          device_type: str, protocols: list[str],
+                          start_delay: float):
     """
     Simulate one device:
       - waits a small start_delay (to avoid all devices starting together)
       - then sends packets forever with random interval within INTERVAL_RANGE
     """
-    time.sleep(start_delay)
+    rnd = RandomPool()
+    await asyncio.sleep(start_delay)
     print(f"🚀 Starting {device_id} ({device_type}) after {start_delay:.1f}s delay")
 
     while True:
-        proto = random.choice(protocols)
-        packet = generate_packet(device_id, device_type, proto)
+        proto = rnd.choice(protocols)
+        packet = generate_packet(device_id, device_type, proto, rnd)
 
         try:
-            res = requests.post(SERVER_URL, json=packet, timeout=5)
-            if res.status_code == 200:
-                out = res.json()
-                label = out.get("label", "Unknown")
-                score = out.get("threat_score", 0)
-
-                if label == "Attack":
-                    print(f"❗[{device_id}] Attack | Score={score}")
-                else:
-                    print(f"✔ [{device_id}] Normal | Score={score}")
+            async with session.post(SERVER_URL, json=packet) as res:
+                if res.status == 200:
+                    out = await res.json()
+                    label = out.get("label", "Unknown")
+                    score = out.get("threat_score", 0)
 
-            else:
-                print(f"⚠️ [{device_id}] Server returned {res.status_code}")
+                    if label == "Attack":
+                        print(f"❗[{device_id}] Attack | Score={score}")
+                    else:
+                        print(f"✔ [{device_id}] Normal | Score={score}")
+
+                else:
+                    print(f"⚠️ [{device_id}] Server returned {res.status}")
 
         except Exception as e:
             print(f"❌ [{device_id}] Error: {e}")
 
         # Slow, realistic interval per device
-        sleep_for = random.uniform(*INTERVAL_RANGE)
-        time.sleep(sleep_for)
+        sleep_for = rnd.uniform(*INTERVAL_RANGE)
+        await asyncio.sleep(sleep_for)
+
+
+async def main():
+    """Run every device on one event loop, sharing one pooled HTTP session."""
+    connector = aiohttp.TCPConnector(
+        limit=POOL_LIMIT, keepalive_timeout=KEEPALIVE_TIMEOUT
+    )
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=REQUEST_TIMEOUT
+    ) as session:
+        # Stagger device start so they don't all flood at the same time
+        # (0.3–1.0s extra delay per index → nicely spread starts)
+        await asyncio.gather(*(
+            simulate_device(
+                session, dev_id, dtype, protos,
+                random.uniform(0.3, 1.0) * idx,
+            )
+            for idx, (dev_id, dtype, protos) in enumerate(DEVICES)
+        ))
 
 
 if __name__ == "__main__":
     print("🌐 Simulating IoT devices (slow, realistic mode)...")
-
-    # Stagger device start so they don't all flood at the same time
-    for idx, (dev_id, dtype, protos) in enumerate(DEVICES):
-        # 0.3–1.0s extra delay per index → nicely spread starts
-        delay = random.uniform(0.3, 1.0) * idx
-        t = threading.Thread(
-            target=simulate_device,
-            args=(dev_id, dtype, protos, delay),
-            daemon=True,
-        )
-        t.start()
-
-    # Keep main thread alive
-    while True:
-        time.sleep(1)
+    asyncio.run(main())
@@ -1,17 +1,21 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import pandas as pd
+import numpy as np
 import pickle
-import json
+import orjson
 import os
 import time
 import traceback
 import io
 import csv
-from queue import Queue
+import threading
+from concurrent.futures import Future
+from queue import Queue, Empty, Full
 from collections import defaultdict, Counter
 from datetime import datetime
 
+from binning import quantize
+
 # === Flask App ===
 app = Flask(__name__)
 CORS(app)
@@ -40,17 +44,27 @@ def safe_load(name: str):
 
 # ---------- Load ML Assets ----------
 model = safe_load("iot_model.pkl")
-scaler = safe_load("scaler.pkl")
+bins = safe_load("bins.pkl")  # per-feature quantile edges (uint8 codes)
+scaler = safe_load("scaler.pkl")  # standardizes IsolationForest input
 encoder_protocol = safe_load("encoder_protocol.pkl")
 encoder_device = safe_load("encoder_device.pkl")
 iso_forest = safe_load("isoforest.pkl")
 meta = safe_load("meta.pkl")
 
-# ---------- Globals ----------
-packet_queue = Queue()
+# model input column order (must match train_model.py)
+FEATURE_COLS = (meta or {}).get("feature_cols") or [
+    "packet_rate", "byte_rate", "packet_size", "connection_duration",
+    "protocol_enc", "device_type_enc", "source_port", "destination_port",
+]
+N_FEATURES = len(FEATURE_COLS)
+PACKET_RATE_IDX = FEATURE_COLS.index("packet_rate")
+BYTE_RATE_IDX = FEATURE_COLS.index("byte_rate")
 
-# in-memory history for reports + intel (each entry is a pkt dict)
-packet_history = []
+# ---------- Globals ----------
+# encoded packets waiting for the SSE stream; bounded so nothing piles up
+# while no dashboard is connected (oldest packets are dropped first)
+STREAM_BACKLOG = 1000
+packet_queue = Queue(maxsize=STREAM_BACKLOG)
 
 device_state = defaultdict(
     lambda: {
@@ -64,53 +78,234 @@ device_state = defaultdict(
 THREAT_THRESHOLD = 7.0
 RECOVERY_TIME = 60  # auto unquarantine after 60s
 
+# batched inference: rows queued by request threads, predicted together
+INFER_BATCH = 64       # max rows per model call
+INFER_TIMEOUT = 1.0    # seconds a request waits for its result
+inference_queue = Queue()  # (feature_row, Future)
+
+# in-memory history for reports + intel, stored column-wise (SoA).
+# String fields are interned to integer ids; HIST_NAMES maps them back.
+HISTORY_CAP = 200_000  # max packets kept; oldest half dropped when full
+HIST = {
+    "epoch": np.empty(HISTORY_CAP, dtype=np.float64),
+    "label": np.empty(HISTORY_CAP, dtype=np.int8),  # 1 = Attack, 0 = Normal
+    "quarantined": np.empty(HISTORY_CAP, dtype=np.bool_),
+    "packet_rate": np.empty(HISTORY_CAP, dtype=np.float32),
+    "device_id": np.empty(HISTORY_CAP, dtype=np.int32),
+    "protocol": np.empty(HISTORY_CAP, dtype=np.int32),
+    "sim_attack_type": np.empty(HISTORY_CAP, dtype=np.int32),
+}
+HIST_NAMES = {"device_id": [], "protocol": [], "sim_attack_type": []}
+hist_ids = {field: {} for field in HIST_NAMES}
+hist_len = 0
+hist_lock = threading.Lock()
+
 
 # ---------- SSE STREAM ----------
 @app.route("/stream")
 def stream():
     def event_stream():
         while True:
-            pkt = packet_queue.get()
-            yield f"data: {json.dumps(pkt)}\n\n"
+            body = packet_queue.get()
+            yield b"data: " + body + b"\n\n"
 
     return Response(event_stream(), mimetype="text/event-stream")
 
 
+def _publish(body):
+    """
+    Queue a packet (already orjson-encoded) for the SSE stream, evicting the
+    oldest when full.
+    """
+    while True:
+        try:
+            packet_queue.put_nowait(body)
+            return
+        except Full:
+            try:
+                packet_queue.get_nowait()
+            except Empty:
+                pass
+
+
 # ---------- Encoding Helpers ----------
+def _build_code_map(encoder, key=str):
+    """
+    Precompute {category -> code} once so per-packet encoding is a dict
+    lookup. `encoder` is the sorted category list saved by train_model.py.
+    Returns (map, default) where default is the code of the first category,
+    used for unseen values.
+    """
+    if encoder is None:
+        return {}, 0.0
+    return {key(c): float(i) for i, c in enumerate(encoder)}, 0.0
+
+
+PROTO_MAP, PROTO_DEFAULT = _build_code_map(
+    encoder_protocol, key=lambda c: str(c).lower()
+)
+DEVICE_MAP, DEVICE_DEFAULT = _build_code_map(encoder_device)
+
+
 def encode_protocol(proto) -> float:
-    try:
-        if encoder_protocol is None:
-            return 0.0
-        proto = str(proto).lower()
-        classes = [x.lower() for x in encoder_protocol.classes_]
-        if proto in classes:
-            idx = classes.index(proto)
-            return encoder_protocol.transform(
-                [encoder_protocol.classes_[idx]]
-            )[0]
-        return encoder_protocol.transform(
-            [encoder_protocol.classes_[0]]
-        )[0]
-    except Exception:
-        return 0.0
+    return PROTO_MAP.get(str(proto).lower(), PROTO_DEFAULT)
 
 
 def encode_device(dtype) -> float:
-    try:
-        if encoder_device is None:
-            return 0.0
-        dtype = str(dtype)
-        classes = [str(x) for x in encoder_device.classes_]
-        if dtype in classes:
-            idx = classes.index(dtype)
-            return encoder_device.transform(
-                [encoder_device.classes_[idx]]
-            )[0]
-        return encoder_device.transform(
-            [encoder_device.classes_[0]]
-        )[0]
-    except Exception:
-        return 0.0
+    return DEVICE_MAP.get(str(dtype), DEVICE_DEFAULT)
+
+
+# ---------- Feature Extraction ----------
+# encoded columns come from the already-extracted protocol / device type;
+# every other column is read straight from the request JSON
+_FEATURE_EXPRS = {
+    "protocol_enc": "encode_protocol(proto)",
+    "device_type_enc": "encode_device(dtype)",
+}
+
+
+def _compile_extractor(cols):
+    """
+    Generate `extract(data, proto, dtype, out)` specialised to `cols`: one
+    straight-line assignment per feature into `out`, in training order.
+    """
+    lines = ["def extract(data, proto, dtype, out):"]
+    for i, col in enumerate(cols):
+        expr = _FEATURE_EXPRS.get(col, f"float(data.get({col!r}, 0))")
+        lines.append(f"    out[{i}] = {expr}")
+    namespace = {
+        "encode_protocol": encode_protocol,
+        "encode_device": encode_device,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["extract"]
+
+
+extract_features = _compile_extractor(FEATURE_COLS)
+
+
+# ---------- Batched Inference ----------
+def _predict_batch(rows):
+    """
+    Run classifier (on quantized bin codes) + isolation forest (on
+    standardized features) once over a (k, n_features) batch, then score it.
+    Returns (preds, anomalies, threat_incs); preds falls back to a rate rule
+    when no model (or no bins.pkl) is loaded.
+    """
+    preds = None
+    if bins is not None and model is not None:
+        preds = model.predict(quantize(rows, bins))
+
+    anomalies = np.zeros(len(rows), dtype=bool)
+    if scaler is not None and iso_forest is not None:
+        try:
+            anomalies = iso_forest.predict(scaler.transform(rows)) == -1
+        except Exception:
+            pass
+
+    packet_rate = rows[:, PACKET_RATE_IDX]
+    byte_rate = rows[:, BYTE_RATE_IDX]
+    if preds is None:
+        # fallback: basic rule-based
+        preds = ((packet_rate > 800) | (byte_rate > 10000)).astype(np.int8)
+
+    # threat score increment per packet
+    threat_incs = (
+        3.0 * (preds == 1)
+        + 2.0 * anomalies
+        + 1.0 * ((packet_rate > 900) | (byte_rate > 12000))
+    )
+
+    return preds, anomalies, threat_incs
+
+
+def _inference_worker():
+    """
+    Block for the first queued row, then take whatever else is already
+    queued (up to INFER_BATCH) without waiting, predict them in one call and
+    resolve each request's Future. Batches form only under load; an idle
+    server adds no delay.
+    """
+    batch = np.empty((INFER_BATCH, N_FEATURES), dtype=np.float32)
+    while True:
+        items = [inference_queue.get()]
+        while len(items) < INFER_BATCH:
+            try:
+                items.append(inference_queue.get_nowait())
+            except Empty:
+                break
+
+        k = len(items)
+        for i, (row, _) in enumerate(items):
+            batch[i] = row
+
+        try:
+            preds, anomalies, threat_incs = _predict_batch(batch[:k])
+        except Exception as e:
+            for _, fut in items:
+                fut.set_exception(e)
+            continue
+
+        for i, (_, fut) in enumerate(items):
+            fut.set_result(
+                (int(preds[i]), bool(anomalies[i]), float(threat_incs[i]))
+            )
+
+
+def predict_packet(row):
+    """
+    Submit one feature row to the batch worker and wait for
+    (pred, anomaly, threat_inc).
+    """
+    fut = Future()
+    inference_queue.put((row, fut))
+    return fut.result(timeout=INFER_TIMEOUT)
+
+
+threading.Thread(target=_inference_worker, daemon=True).start()
+
+
+# ---------- Packet History ----------
+def _intern(field, value):
+    """Return the integer id of `value` in HIST_NAMES[field], adding it if new."""
+    ids = hist_ids[field]
+    i = ids.get(value)
+    if i is None:
+        i = ids[value] = len(HIST_NAMES[field])
+        HIST_NAMES[field].append(value)
+    return i
+
+
+def _history_append(pkt):
+    """
+    Write one packet into the next HIST slot. When full, the oldest half is
+    shifted out so rows stay contiguous and in epoch order, letting
+    _filter_by_window binary-search the cutoff in O(log n).
+    """
+    global hist_len
+    with hist_lock:
+        if hist_len == HISTORY_CAP:
+            keep = HISTORY_CAP // 2
+            for arr in HIST.values():
+                arr[:keep] = arr[HISTORY_CAP - keep:]
+            hist_len = keep
+
+        i = hist_len
+        # concurrent requests can finish out of order; clamp so the epoch
+        # column stays sorted for the searchsorted in _filter_by_window
+        epoch = pkt["epoch"]
+        if i and epoch < HIST["epoch"][i - 1]:
+            epoch = HIST["epoch"][i - 1]
+        HIST["epoch"][i] = epoch
+        HIST["label"][i] = pkt["label"] == "Attack"
+        HIST["quarantined"][i] = pkt["quarantined"]
+        HIST["packet_rate"][i] = pkt["packet_rate"]
+        HIST["device_id"][i] = _intern("device_id", pkt["device_id"])
+        HIST["protocol"][i] = _intern("protocol", pkt["protocol"])
+        HIST["sim_attack_type"][i] = _intern(
+            "sim_attack_type", pkt["sim_attack_type"]
+        )
+        hist_len = i + 1
 
 
 # ---------- Main Packet API ----------
@@ -118,10 +313,11 @@ def encode_device(dtype) -> float:
 def receive_packet():
     try:
         data = request.get_json(force=True)
-        device_id = data.get("device_id", "unknown")
-        proto = data.get("protocol", "mqtt")
-        dtype = data.get("device_type", "UnknownDevice")
-        sim_attack_type = data.get("attack_type", "Normal")  # from simulator
+        # free-form client fields → str, so they always serialize and intern
+        device_id = str(data.get("device_id", "unknown"))
+        proto = str(data.get("protocol", "mqtt"))
+        dtype = str(data.get("device_type", "UnknownDevice"))
+        sim_attack_type = str(data.get("attack_type", "Normal"))  # from simulator
 
         # State entry
         st = device_state[device_id]
@@ -140,56 +336,17 @@ def receive_packet():
                 print(f"🚫 {device_id} blocked (quarantined)")
                 return jsonify({"status": "blocked", "device": device_id})
 
-        # Build feature vector
-        features = {
-            "packet_rate": float(data.get("packet_rate", 0)),
-            "byte_rate": float(data.get("byte_rate", 0)),
-            "packet_size": float(data.get("packet_size", 0)),
-            "connection_duration": float(data.get("connection_duration", 0)),
-            "protocol_enc": encode_protocol(proto),
-            "device_type_enc": encode_device(dtype),
-            "source_port": float(data.get("source_port", 0)),
-            "destination_port": float(data.get("destination_port", 0)),
-        }
-
-        df = pd.DataFrame([features])
-
-        # ML prediction with fallback
-        scaled = df
-        if scaler is not None:
-            scaled = scaler.transform(df)
-
-        if scaler is not None and model is not None:
-            pred = model.predict(scaled)[0]
-            pred_label = "Attack" if pred == 1 else "Normal"
-        else:
-            # fallback: basic rule-based
-            pred_label = "Attack" if (
-                features["packet_rate"] > 800
-                or features["byte_rate"] > 10000
-            ) else "Normal"
-
-        # anomaly detection
-        anomaly_flag = False
-        if iso_forest is not None:
-            try:
-                if iso_forest.predict(scaled)[0] == -1:
-                    anomaly_flag = True
-            except Exception:
-                pass
+        # Build feature vector: plain ndarray in training column order
+        row = np.empty(N_FEATURES, dtype=np.float32)
+        extract_features(data, proto, dtype, row)
+        packet_rate = float(data.get("packet_rate", 0))
+        byte_rate = float(data.get("byte_rate", 0))
 
-        # threat scoring
-        threat_inc = 0.0
-        if pred_label == "Attack":
-            threat_inc += 3.0
-        if anomaly_flag:
-            threat_inc += 2.0
-        if (
-            features["packet_rate"] > 900
-            or features["byte_rate"] > 12000
-        ):
-            threat_inc += 1.0
+        # ML prediction + threat increment (batched with concurrent packets)
+        pred, anomaly_flag, threat_inc = predict_packet(row)
+        pred_label = "Attack" if pred == 1 else "Normal"
 
+        # threat scoring (increment computed for the whole batch)
         st["threat_score"] = st["threat_score"] * 0.90 + threat_inc
 
         # quarantine check
@@ -201,16 +358,20 @@ def receive_packet():
                 f"(score {st['threat_score']:.2f})"
             )
 
+        # precise timestamp with milliseconds → avoids duplicate x-axis labels
+        # (formatted from `now` directly, cheaper than datetime.strftime)
+        h, m, sec = time.localtime(now)[3:6]
+        ms = int((now % 1) * 1000)
+
         # final packet data (this is what frontend + reports see)
         pkt = {
-            # precise timestamp with milliseconds → avoids duplicate x-axis labels
-            "timestamp": datetime.now().strftime("%H:%M:%S.%f")[:-3],
+            "timestamp": f"{h:02d}:{m:02d}:{sec:02d}.{ms:03d}",
             "epoch": now,  # for time-window filtering
             "device_id": device_id,
             "device_type": dtype,
             "protocol": proto,
-            "packet_rate": features["packet_rate"],
-            "byte_rate": features["byte_rate"],
+            "packet_rate": packet_rate,
+            "byte_rate": byte_rate,
             "label": pred_label,
             "anomaly": anomaly_flag,
             "threat_score": round(st["threat_score"], 2),
@@ -218,11 +379,15 @@ def receive_packet():
             "sim_attack_type": sim_attack_type,
         }
 
+        # serialize once, before anything is recorded; the same bytes go to
+        # the SSE stream and the HTTP response
+        body = orjson.dumps(pkt)
+
         # store in history (for reports & intel)
-        packet_history.append(pkt)
+        _history_append(pkt)
 
         # push packet to SSE stream
-        packet_queue.put(pkt)
+        _publish(body)
 
         # console output
         print(
@@ -230,7 +395,7 @@ def receive_packet():
             f"(Score={pkt['threat_score']})"
         )
 
-        return jsonify(pkt)
+        return Response(body, mimetype="application/json")
 
     except Exception as e:
         traceback.print_exc()
@@ -242,7 +407,7 @@ def receive_packet():
 def unquarantine_device():
     try:
         data = request.get_json(force=True)
-        device_id = data.get("device_id")
+        device_id = str(data.get("device_id"))
 
         if device_id not in device_state:
             return jsonify({"message": "Device not found"}), 404
@@ -261,22 +426,34 @@ def unquarantine_device():
 
 # ---------- Helpers for reports / intel ----------
 def _filter_by_window(seconds):
-    """Return packets from the last `seconds` seconds."""
+    """Return {field: array} copies of HIST for the last `seconds` seconds."""
     cutoff = time.time() - seconds
-    return [p for p in packet_history if p.get("epoch", 0) >= cutoff]
+    with hist_lock:
+        n = hist_len
+        lo = int(np.searchsorted(HIST["epoch"][:n], cutoff, side="left"))
+        return {field: arr[lo:n].copy() for field, arr in HIST.items()}
+
+
+def _count_names(window, field, mask=None):
+    """Count interned `field` values in a window → {name: count}."""
+    ids = window[field] if mask is None else window[field][mask]
+    uniq, counts = np.unique(ids, return_counts=True)
+    names = HIST_NAMES[field]
+    return {names[i]: int(c) for i, c in zip(uniq, counts)}
 
 
 def _build_report(seconds):
-    packets = _filter_by_window(seconds)
-    total = len(packets)
-    attacks = sum(1 for p in packets if p.get("label") == "Attack")
-    normal = sum(1 for p in packets if p.get("label") == "Normal")
+    window = _filter_by_window(seconds)
+    total = len(window["epoch"])
+    is_attack = window["label"] == 1
+    attacks = int(is_attack.sum())
+    normal = total - attacks
     quarantined_devices = sorted(
-        {p["device_id"] for p in packets if p.get("quarantined")}
+        _count_names(window, "device_id", window["quarantined"])
     )
-    proto_counts = Counter(p.get("protocol", "unknown") for p in packets)
+    proto_counts = _count_names(window, "protocol")
     device_attack_counts = Counter(
-        p["device_id"] for p in packets if p.get("label") == "Attack"
+        _count_names(window, "device_id", is_attack)
     )
 
     report = {
@@ -328,30 +505,36 @@ def _report_to_csv(report_dict):
 
 def _build_intel(seconds=3600):
     """Generate threat intelligence summary from recent packets."""
-    packets = _filter_by_window(seconds)
-    total = len(packets)
-    attacks = [p for p in packets if p.get("label") == "Attack"]
+    window = _filter_by_window(seconds)
+    total = len(window["epoch"])
+    is_attack = window["label"] == 1
+    n_attacks = int(is_attack.sum())
 
     # overall risk score (0–100)
     if total:
-        base = (len(attacks) / total) * 80
+        base = (n_attacks / total) * 80
     else:
         base = 0.0
-    quarantined = {p["device_id"] for p in packets if p.get("quarantined")}
+    quarantined = _count_names(window, "device_id", window["quarantined"])
     risk_score = min(100, round(base + len(quarantined) * 5))
 
     # attack pattern types (from simulator)
-    pattern_counts = Counter(
-        p.get("sim_attack_type", "Normal")
-        for p in attacks
-        if p.get("sim_attack_type")
-    )
+    pattern_counts = {
+        name: cnt
+        for name, cnt in _count_names(
+            window, "sim_attack_type", is_attack
+        ).items()
+        if name
+    }
 
     # protocol anomalies: high packet rate
-    high_rate = [p for p in packets if p.get("packet_rate", 0) > 1000]
-    proto_anom = Counter(p.get("protocol", "unknown") for p in high_rate)
+    proto_anom = _count_names(
+        window, "protocol", window["packet_rate"] > 1000
+    )
 
-    device_attack_counts = Counter(p["device_id"] for p in attacks)
+    device_attack_counts = Counter(
+        _count_names(window, "device_id", is_attack)
+    )
     high_risk_devices = [d for d, _ in device_attack_counts.most_common(5)]
 
     intel = {
@@ -359,7 +542,7 @@ def _build_intel(seconds=3600):
         "window_seconds": seconds,
         "risk_score": risk_score,
         "total_packets": total,
-        "total_attacks": len(attacks),
+        "total_attacks": n_attacks,
         "high_risk_devices": high_risk_devices,
         "quarantined_devices": list(quarantined),
         "attack_patterns": dict(pattern_counts),
@@ -3,27 +3,47 @@ import pandas as pd
 import numpy as np
 import os
 import pickle
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.ensemble import RandomForestClassifier, IsolationForest
+from binning import N_BINS, fit_bins, quantize
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import HistGradientBoostingClassifier, IsolationForest
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 
 DATA_PATH = "dataset/iot_data_realistic.csv"
-df = pd.read_csv(DATA_PATH)
+# Only load the columns we train on, with explicit dtypes (no inference pass,
+# no object columns for IPs/timestamps). Integer columns are read as nullable
+# "Int32" so blank cells survive until dropna() below.
+CSV_DTYPES = {
+    "packet_rate": "Int32",
+    "byte_rate": "Int32",
+    "packet_size": "float32",
+    "connection_duration": "float32",
+    "source_port": "Int32",
+    "destination_port": "Int32",
+    "protocol": "category",
+    "device_type": "category",
+    "attack_type": "category",
+    "label": "category",
+}
+df = pd.read_csv(DATA_PATH, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES)
 print("Loaded dataset:", df.shape)
 
 # Quick cleanup: drop exact duplicates and rows with NaN
 df = df.drop_duplicates().dropna().reset_index(drop=True)
+df = df.astype({c: "int32" for c, t in CSV_DTYPES.items() if t == "Int32"})
 
 # Keep a copy for analysis (attack_type distribution)
 print("Attack type distribution:\n", df['attack_type'].value_counts())
 
-# Categorical encoders
-proto_encoder = LabelEncoder()
-df['protocol_enc'] = proto_encoder.fit_transform(df['protocol'].astype(str).str.lower())
+# Categorical encoders: codes = index into the sorted category list
+# (same codes LabelEncoder produced, via a hash lookup instead of a sort)
+proto_lower = df['protocol'].astype(str).str.lower()
+proto_cats = pd.CategoricalDtype(sorted(proto_lower.unique()))
+df['protocol_enc'] = proto_lower.astype(proto_cats).cat.codes.astype(np.int8)
 
-device_encoder = LabelEncoder()
-df['device_type_enc'] = device_encoder.fit_transform(df['device_type'].astype(str))
+device_str = df['device_type'].astype(str)
+device_cats = pd.CategoricalDtype(sorted(device_str.unique()))
+df['device_type_enc'] = device_str.astype(device_cats).cat.codes.astype(np.int8)
 
 # Choose features for training (numeric + encoded categorical)
 # We intentionally drop raw strings and IPs & timestamp
@@ -33,28 +53,44 @@ feature_cols = [
 ]
 
 X = df[feature_cols]
-y = df['label'].map({'Normal': 0, 'Attack': 1})
+y = df['label'].map({'Normal': 0, 'Attack': 1}).astype(np.int8)
 
 # Save feature names for runtime
 os.makedirs("model", exist_ok=True)
 pickle.dump(feature_cols, open("model/feature_names.pkl", "wb"))
 
-# Scale numeric features (we'll fit scaler on full X)
+# Quantize each feature into (up to) 256 quantile bins → uint8 codes.
+# Trees only care about feature order, so bin indices replace scaling;
+# the inner bin edges are saved so runtime bins packets identically.
+# float32 is plenty for these features (CSV is already int32/float32) and
+# halves memory; bin edges are float32 too and stream_app builds float32
+# rows, so runtime binning matches training exactly
+X_raw = X.values.astype(np.float32, copy=False)
+bins = fit_bins(X_raw)
+X_binned = quantize(X_raw, bins)
+
+# IsolationForest splits uniformly over each feature's value range, so it
+# needs continuous inputs (bin codes would change what counts as isolated):
+# give it standardized float32 features instead of bin codes.
 scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+X_std = scaler.fit_transform(X_raw).astype(np.float32, copy=False)
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.2, random_state=42, stratify=y
+# Train-test split (same rows for the binned and standardized views)
+X_train, X_test, X_std_train, _, y_train, y_test = train_test_split(
+    X_binned, X_std, y, test_size=0.2, random_state=42, stratify=y
 )
 
-# RandomForest classifier
-clf = RandomForestClassifier(
-    n_estimators=150,
-    max_depth=12,
-    random_state=42,
-    class_weight="balanced_subsample",
-    n_jobs=-1
+# Histogram gradient boosting classifier (fewer, shallower trees than the
+# old 150x depth-12 RandomForest → much cheaper per-packet predict).
+# Tuned on simulate_iot traffic, not just the held-out split: class
+# weighting, deeper boosting or small leaves overfit this dataset and label
+# several % of normal simulator packets as Attack (+3 threat each).
+clf = HistGradientBoostingClassifier(
+    max_iter=60,
+    max_depth=6,
+    min_samples_leaf=100,
+    l2_regularization=1.0,
+    random_state=42
 )
 clf.fit(X_train, y_train)
 
@@ -66,20 +102,22 @@ print("Accuracy:", round(accuracy_score(y_test, y_pred)*100,2), "%")
 
 # Train IsolationForest on training set (for anomaly detection)
 iso = IsolationForest(n_estimators=100, contamination=0.08, random_state=42)
-iso.fit(X_train)
+iso.fit(X_std_train)
 
 # Save artifacts
 pickle.dump(clf, open("model/iot_model.pkl", "wb"))
+pickle.dump(bins, open("model/bins.pkl", "wb"))
 pickle.dump(scaler, open("model/scaler.pkl", "wb"))
-pickle.dump(proto_encoder, open("model/encoder_protocol.pkl", "wb"))
-pickle.dump(device_encoder, open("model/encoder_device.pkl", "wb"))
+pickle.dump(proto_cats.categories.tolist(), open("model/encoder_protocol.pkl", "wb"))
+pickle.dump(device_cats.categories.tolist(), open("model/encoder_device.pkl", "wb"))
 pickle.dump(iso, open("model/isoforest.pkl", "wb"))
 
 # Also save mapping for convenience
 meta = {
     "feature_cols": feature_cols,
-    "protocol_classes": list(proto_encoder.classes_),
-    "device_classes": list(device_encoder.classes_)
+    "n_bins": N_BINS,
+    "protocol_classes": proto_cats.categories.tolist(),
+    "device_classes": device_cats.categories.tolist()
 }
 pickle.dump(meta, open("model/meta.pkl", "wb"))
 